@@ -18,26 +18,65 @@ import abc
 from dataclasses import dataclass, field, fields, replace
 import datetime
 import functools
-import itertools
+import operator
 import typing
 from typing import Callable, Tuple
-
-import google.cloud.bigquery as bq
+import weakref
 
 import bigframes.core.expression as ex
 import bigframes.core.guid
 import bigframes.core.identifiers as bfet_ids
 from bigframes.core.ordering import OrderingExpression
+import bigframes.core.ordering as orderings
 import bigframes.core.schema as schemata
 import bigframes.core.window_spec as window
 import bigframes.dtypes
 import bigframes.operations.aggregations as agg_ops
 
 if typing.TYPE_CHECKING:
-    import bigframes.core.ordering as orderings
+    import google.cloud.bigquery as bq
+
     import bigframes.session
 
 
+_T = typing.TypeVar("_T")
+
+
+class _cached_property(typing.Generic[_T]):
+    """
+    Minimal replacement for functools.cached_property.
+
+    Stores the computed value directly in the instance __dict__, which also works on frozen
+    dataclasses, and skips the per-instance lock functools.cached_property takes before
+    Python 3.12. Nodes are immutable, so a racing duplicate computation is harmless.
+    """
+
+    def __init__(self, func: Callable[[typing.Any], _T]):
+        self.func = func
+        self.attrname = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner: type, name: str):
+        self.attrname = name
+
+    @typing.overload
+    def __get__(
+        self, instance: None, owner: typing.Optional[type] = None
+    ) -> _cached_property[_T]:
+        ...
+
+    @typing.overload
+    def __get__(self, instance: object, owner: typing.Optional[type] = None) -> _T:
+        ...
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self.func(instance)
+        instance.__dict__[self.attrname] = value
+        return value
+
+
 # A fixed number of variable to assume for overhead on some operations
 OVERHEAD_VARIABLES = 5
 
@@ -45,12 +84,56 @@ OVERHEAD_VARIABLES = 5
 COL_OFFSET = int
 
 
-@dataclass(frozen=True)
-class BigFrameNode:
+@functools.cache
+def _field_values_getter(
+    node_type: typing.Type[BigFrameNode],
+) -> Callable[[BigFrameNode], typing.Any]:
+    """Build, once per node class, a getter returning a tuple of all dataclass field values of a node."""
+    names = tuple(field.name for field in fields(node_type))
+    if not names:
+        return lambda node: ()
+    getter = operator.attrgetter(*names)
+    if len(names) == 1:
+        # attrgetter returns the bare value for a single name, which would give a node the
+        # same hash as its only child
+        return lambda node: (getter(node),)
+    return getter
+
+
+class _InternedNodeMeta(type):
+    """
+    Hash-conses nodes on construction.
+
+    Constructing a node that is structurally equal to a live node returns the existing
+    instance instead, so duplicate subtrees share identity and cached properties.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        node = super().__call__(*args, **kwargs)
+        values_getter = _field_values_getter(cls)  # type: ignore[arg-type]
+        # Children are interned too, so on a hash match the key comparison short-circuits on
+        # child identity rather than walking whole subtrees
+        key = (cls, values_getter(node))
+        interned = _INTERNED_NODES.get(key)
+        if interned is None:
+            _INTERNED_NODES[key] = node
+            return node
+        return interned
+
+
+_INTERNED_NODES: weakref.WeakValueDictionary[
+    typing.Tuple[type, typing.Any], BigFrameNode
+] = weakref.WeakValueDictionary()
+
+
+@dataclass(frozen=True, eq=False)
+class BigFrameNode(metaclass=_InternedNodeMeta):
     """
     Immutable node for representing 2D typed array as a tree of operators.
 
-    All subclasses must be hashable so as to be usable as caching key.
+    All subclasses must be hashable so as to be usable as caching key. Nodes are
+    hash-consed: structurally equal nodes that are alive at the same time are the same object,
+    and compare equal only to themselves.
     """
 
     @property
@@ -76,32 +159,61 @@ class BigFrameNode:
         """Direct children of this node"""
         return tuple([])
 
-    @functools.cached_property
+    @_cached_property
     def session(self):
-        sessions = []
+        session = None
         for child in self.child_nodes:
-            if child.session is not None:
-                sessions.append(child.session)
-        unique_sessions = len(set(sessions))
-        if unique_sessions > 1:
-            raise ValueError("Cannot use combine sources from multiple sessions.")
-        elif unique_sessions == 1:
-            return sessions[0]
-        return None
+            child_session = child.session
+            if child_session is None:
+                continue
+            if session is None:
+                session = child_session
+            elif child_session is not session:
+                raise ValueError("Cannot use combine sources from multiple sessions.")
+        return session
+
+    # Interning guarantees structurally equal live nodes are the same object, so equality is
+    # a pointer comparison. Subclasses must keep eq=False so the dataclass decorator does not
+    # generate a deep structural __eq__ and an uncached __hash__.
+    __eq__ = object.__eq__
+
+    def __hash__(self) -> int:
+        return self._node_hash
 
     # BigFrameNode trees can be very deep so its important avoid recalculating the hash from scratch
-    # Each subclass of BigFrameNode should use this property to implement __hash__
-    # The default dataclass-generated __hash__ method is not cached
-    @functools.cached_property
-    def _node_hash(self):
-        return hash(tuple(hash(getattr(self, field.name)) for field in fields(self)))
-
-    @property
-    def roots(self) -> typing.Set[BigFrameNode]:
-        roots = itertools.chain.from_iterable(
-            map(lambda child: child.roots, self.child_nodes)
+    @_cached_property
+    def _node_hash(self) -> int:
+        values_getter = _field_values_getter(type(self))  # type: ignore[arg-type]
+        return hash(values_getter(self))
+
+    @_cached_property
+    def roots(self) -> typing.FrozenSet[BigFrameNode]:
+        # Resolve descendants first so shared subtrees are only walked once
+        _resolve_bottom_up(self, "roots")
+        if len(self.child_nodes) == 1:
+            # Unary chains share their child's frozenset rather than copying it
+            return self.child_nodes[0].roots
+        return frozenset().union(*(child.roots for child in self.child_nodes))
+
+    @_cached_property
+    def can_fast_peek(self) -> bool:
+        """Whether a few arbitrary rows can be read without evaluating the whole tree."""
+        _resolve_bottom_up(self, "can_fast_peek")
+        if all(isinstance(root, ReadLocalNode) for root in self.roots):
+            return True
+        return (not self.non_local) and all(
+            child.can_fast_peek for child in self.child_nodes
         )
-        return set(roots)
+
+    @_cached_property
+    def can_fast_head(self) -> bool:
+        """Can get head fast if can push head operator down to leafs and operators preserve rows."""
+        return False
+
+    @_cached_property
+    def row_count(self) -> typing.Optional[int]:
+        """Row count determined from local metadata. None means unknown."""
+        return None
 
     @property
     @abc.abstractmethod
@@ -146,21 +258,31 @@ class BigFrameNode:
         """
         ...
 
-    @functools.cached_property
+    @_cached_property
+    def _totals(self) -> Tuple[int, int, int]:
+        """Subtree totals of (variables, relational ops, joins), computed in a single pass."""
+        _resolve_bottom_up(self, "_totals")
+        variables = self.variables_introduced
+        relational_ops = self.relation_ops_created
+        joins = int(self.joins)
+        for child in self.child_nodes:
+            child_variables, child_relational_ops, child_joins = child._totals
+            variables += child_variables
+            relational_ops += child_relational_ops
+            joins += child_joins
+        return variables, relational_ops, joins
+
+    @property
     def total_variables(self) -> int:
-        return self.variables_introduced + sum(
-            map(lambda x: x.total_variables, self.child_nodes)
-        )
+        return self._totals[0]
 
-    @functools.cached_property
+    @property
     def total_relational_ops(self) -> int:
-        return self.relation_ops_created + sum(
-            map(lambda x: x.total_relational_ops, self.child_nodes)
-        )
+        return self._totals[1]
 
-    @functools.cached_property
+    @property
     def total_joins(self) -> int:
-        return int(self.joins) + sum(map(lambda x: x.total_joins, self.child_nodes))
+        return self._totals[2]
 
     @property
     def planning_complexity(self) -> int:
@@ -169,7 +291,8 @@ class BigFrameNode:
 
         Used to determine when to decompose overly complex computations. May require tuning.
         """
-        return self.total_variables * self.total_relational_ops * (1 + self.total_joins)
+        variables, relational_ops, joins = self._totals
+        return variables * relational_ops * (1 + joins)
 
     @abc.abstractmethod
     def transform_children(
@@ -187,7 +310,7 @@ class BigFrameNode:
         """
         return False
 
-    @functools.cached_property
+    @_cached_property
     def defined_variables(self) -> set[str]:
         """Full set of variables defined in the namespace, even if not selected."""
         self_defined_variables = set(self.schema.names)
@@ -198,18 +321,41 @@ class BigFrameNode:
         )
 
 
-@dataclass(frozen=True)
+def _resolve_bottom_up(node: BigFrameNode, attr: str) -> None:
+    """
+    Populate the cached property attr on all descendants of node, deepest nodes first.
+
+    Walks iteratively so that very deep trees do not exceed the recursion limit.
+    """
+    stack = [(child, False) for child in node.child_nodes]
+    while stack:
+        current, children_resolved = stack.pop()
+        if attr in current.__dict__:
+            continue
+        if children_resolved:
+            getattr(current, attr)
+        else:
+            stack.append((current, True))
+            stack.extend((child, False) for child in current.child_nodes)
+
+
+@dataclass(frozen=True, eq=False)
 class UnaryNode(BigFrameNode):
     child: BigFrameNode
 
-    @property
+    @_cached_property
     def child_nodes(self) -> typing.Sequence[BigFrameNode]:
         return (self.child,)
 
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
         return self.child.schema
 
+    @_cached_property
+    def row_count(self) -> typing.Optional[int]:
+        _resolve_bottom_up(self, "row_count")
+        return self.child.row_count if self.row_preserving else None
+
     @property
     def explicitly_ordered(self) -> bool:
         return self.child.explicitly_ordered
@@ -217,14 +363,17 @@ class UnaryNode(BigFrameNode):
     def transform_children(
         self, t: Callable[[BigFrameNode], BigFrameNode]
     ) -> BigFrameNode:
-        return replace(self, child=t(self.child))
+        new_child = t(self.child)
+        if new_child is self.child:
+            return self
+        return replace(self, child=new_child)
 
-    @property
+    @_cached_property
     def order_ambiguous(self) -> bool:
         return self.child.order_ambiguous
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class JoinNode(BigFrameNode):
     left_child: BigFrameNode
     right_child: BigFrameNode
@@ -239,7 +388,7 @@ class JoinNode(BigFrameNode):
     def non_local(self) -> bool:
         return True
 
-    @property
+    @_cached_property
     def child_nodes(self) -> typing.Sequence[BigFrameNode]:
         return (self.left_child, self.right_child)
 
@@ -252,21 +401,18 @@ class JoinNode(BigFrameNode):
         # Do not consider user pre-join ordering intent - they need to re-order post-join in unordered mode.
         return False
 
-    def __hash__(self):
-        return self._node_hash
-
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
-        items = []
-        schema_items = itertools.chain(
-            self.left_child.schema.items, self.right_child.schema.items
-        )
+        # Both sides are renamed positionally, so only the cached dtype tuples are needed
+        dtypes = (*self.left_child.schema.dtypes, *self.right_child.schema.dtypes)
         identifiers = bfet_ids.standard_identifiers()
-        for id, item in zip(identifiers, schema_items):
-            items.append(schemata.SchemaItem(id, item.dtype))
-        return schemata.ArraySchema(tuple(items))
+        return schemata.ArraySchema(
+            tuple(
+                schemata.SchemaItem(id, dtype) for id, dtype in zip(identifiers, dtypes)
+            )
+        )
 
-    @functools.cached_property
+    @_cached_property
     def variables_introduced(self) -> int:
         """Defines the number of variables generated by the current node. Used to estimate query planning complexity."""
         return OVERHEAD_VARIABLES
@@ -278,43 +424,56 @@ class JoinNode(BigFrameNode):
     def transform_children(
         self, t: Callable[[BigFrameNode], BigFrameNode]
     ) -> BigFrameNode:
-        return replace(
-            self, left_child=t(self.left_child), right_child=t(self.right_child)
-        )
+        new_left = t(self.left_child)
+        new_right = t(self.right_child)
+        if new_left is self.left_child and new_right is self.right_child:
+            return self
+        return replace(self, left_child=new_left, right_child=new_right)
 
     @property
     def defines_namespace(self) -> bool:
         return True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ConcatNode(BigFrameNode):
     children: Tuple[BigFrameNode, ...]
 
     def __post_init__(self):
         if len(self.children) == 0:
             raise ValueError("Concat requires at least one input table. Zero provided.")
-        child_schemas = [child.schema.dtypes for child in self.children]
-        if not len(set(child_schemas)) == 1:
-            raise ValueError("All inputs must have identical dtypes. {child_schemas}")
+        first_dtypes = self.children[0].schema.dtypes
+        for child in self.children[1:]:
+            if child.schema.dtypes != first_dtypes:
+                raise ValueError(
+                    f"All inputs must have identical dtypes. {first_dtypes} != {child.schema.dtypes}"
+                )
 
     @property
     def child_nodes(self) -> typing.Sequence[BigFrameNode]:
         return self.children
 
-    @property
+    @_cached_property
     def order_ambiguous(self) -> bool:
         return any(child.order_ambiguous for child in self.children)
 
+    @_cached_property
+    def row_count(self) -> typing.Optional[int]:
+        _resolve_bottom_up(self, "row_count")
+        total = 0
+        for child in self.children:
+            count = child.row_count
+            if count is None:
+                return None
+            total += count
+        return total
+
     @property
     def explicitly_ordered(self) -> bool:
         # Consider concat as an ordered operations (even though input frames may not be ordered)
         return True
 
-    def __hash__(self):
-        return self._node_hash
-
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
         # TODO: Output names should probably be aligned beforehand or be part of concat definition
         items = tuple(
@@ -323,7 +482,7 @@ class ConcatNode(BigFrameNode):
         )
         return schemata.ArraySchema(items)
 
-    @functools.cached_property
+    @_cached_property
     def variables_introduced(self) -> int:
         """Defines the number of variables generated by the current node. Used to estimate query planning complexity."""
         return len(self.schema.items) + OVERHEAD_VARIABLES
@@ -331,20 +490,30 @@ class ConcatNode(BigFrameNode):
     def transform_children(
         self, t: Callable[[BigFrameNode], BigFrameNode]
     ) -> BigFrameNode:
-        return replace(self, children=tuple(t(child) for child in self.children))
+        new_children = tuple(t(child) for child in self.children)
+        if all(new is old for new, old in zip(new_children, self.children)):
+            return self
+        return replace(self, children=new_children)
 
 
 # Input Nodex
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class LeafNode(BigFrameNode):
-    @property
-    def roots(self) -> typing.Set[BigFrameNode]:
-        return {self}
+    # Plain class attribute, so traversals skip descriptor dispatch on leaves
+    child_nodes = ()
+
+    @_cached_property
+    def roots(self) -> typing.FrozenSet[BigFrameNode]:
+        return frozenset({self})
 
     @property
     def supports_fast_head(self) -> bool:
         return False
 
+    @property
+    def can_fast_head(self) -> bool:
+        return self.supports_fast_head
+
     def transform_children(
         self, t: Callable[[BigFrameNode], BigFrameNode]
     ) -> BigFrameNode:
@@ -356,21 +525,18 @@ class LeafNode(BigFrameNode):
         return None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ReadLocalNode(LeafNode):
     feather_bytes: bytes
     data_schema: schemata.ArraySchema
     n_rows: int
     session: typing.Optional[bigframes.session.Session] = None
 
-    def __hash__(self):
-        return self._node_hash
-
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
         return self.data_schema
 
-    @functools.cached_property
+    @_cached_property
     def variables_introduced(self) -> int:
         """Defines the number of variables generated by the current node. Used to estimate query planning complexity."""
         return len(self.schema.items) + 1
@@ -401,6 +567,10 @@ class GbqTable:
     n_rows: int = field()
     cluster_cols: typing.Optional[Tuple[str, ...]]
 
+    @_cached_property
+    def physical_names(self) -> typing.FrozenSet[str]:
+        return frozenset(field.name for field in self.physical_schema)
+
     @staticmethod
     def from_table(table: bq.Table) -> GbqTable:
         return GbqTable(
@@ -416,7 +586,7 @@ class GbqTable:
 
 
 ## Put ordering in here or just add order_by node above?
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ReadTableNode(LeafNode):
     table: GbqTable
     # Subset of physical schema columns, with chosen BQ types
@@ -434,8 +604,7 @@ class ReadTableNode(LeafNode):
 
     def __post_init__(self):
         # enforce invariants
-        physical_names = set(map(lambda i: i.name, self.table.physical_schema))
-        if not set(self.columns.names).issubset(physical_names):
+        if not self.table.physical_names.issuperset(self.columns.names):
             raise ValueError(
                 f"Requested schema {self.columns} cannot be derived from table schemal {self.table.physical_schema}"
             )
@@ -446,9 +615,6 @@ class ReadTableNode(LeafNode):
     def session(self):
         return self.table_session
 
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def schema(self) -> schemata.ArraySchema:
         return self.columns
@@ -473,7 +639,7 @@ class ReadTableNode(LeafNode):
     def explicitly_ordered(self) -> bool:
         return len(self.total_order_cols) > 0
 
-    @functools.cached_property
+    @_cached_property
     def variables_introduced(self) -> int:
         return len(self.schema.items) + 1
 
@@ -485,7 +651,7 @@ class ReadTableNode(LeafNode):
 
 
 # This node shouldn't be used in the "original" expression tree, only used as replacement for original during planning
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class CachedTableNode(LeafNode):
     # The original BFET subtree that was cached
     # note: this isn't a "child" node.
@@ -496,13 +662,13 @@ class CachedTableNode(LeafNode):
 
     def __post_init__(self):
         # enforce invariants
-        physical_names = set(map(lambda i: i.name, self.table.physical_schema))
+        physical_names = self.table.physical_names
         logical_names = self.original_node.schema.names
-        if not set(logical_names).issubset(physical_names):
+        if not physical_names.issuperset(logical_names):
             raise ValueError(
                 f"Requested schema {logical_names} cannot be derived from table schema {self.table.physical_schema}"
             )
-        if not set(self._hidden_columns).issubset(physical_names):
+        if not physical_names.issuperset(self._hidden_columns):
             raise ValueError(
                 f"Requested hidden columns {self._hidden_columns} cannot be derived from table schema {self.table.physical_schema}"
             )
@@ -511,18 +677,15 @@ class CachedTableNode(LeafNode):
     def session(self):
         return self.original_node.session
 
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def schema(self) -> schemata.ArraySchema:
         return self.original_node.schema
 
-    @functools.cached_property
+    @_cached_property
     def variables_introduced(self) -> int:
         return len(self.schema.items) + OVERHEAD_VARIABLES
 
-    @property
+    @_cached_property
     def _hidden_columns(self) -> typing.Tuple[str, ...]:
         """Physical columns used to define ordering but not directly exposed as value columns."""
         if self.ordering is None:
@@ -540,7 +703,7 @@ class CachedTableNode(LeafNode):
         # clustered and/or partitioned on ordering key
         return (self.ordering is None) or self.ordering.is_sequential
 
-    @property
+    @_cached_property
     def order_ambiguous(self) -> bool:
         return not isinstance(self.ordering, orderings.TotalOrdering)
 
@@ -556,13 +719,10 @@ class CachedTableNode(LeafNode):
 
 
 # Unary nodes
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class PromoteOffsetsNode(UnaryNode):
     col_id: str
 
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def non_local(self) -> bool:
         return True
@@ -577,12 +737,12 @@ class PromoteOffsetsNode(UnaryNode):
     def relation_ops_created(self) -> int:
         return 2
 
-    @functools.cached_property
+    @_cached_property
     def variables_introduced(self) -> int:
         return 1
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class FilterNode(UnaryNode):
     predicate: ex.Expression
 
@@ -590,29 +750,25 @@ class FilterNode(UnaryNode):
     def row_preserving(self) -> bool:
         return False
 
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def variables_introduced(self) -> int:
         return 1
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class OrderByNode(UnaryNode):
     by: Tuple[OrderingExpression, ...]
 
     def __post_init__(self):
         available_variables = self.child.schema.names
-        for order_expr in self.by:
-            for variable in order_expr.scalar_expression.unbound_variables:
-                if variable not in available_variables:
-                    raise ValueError(
-                        f"Cannot over unknown id:{variable}, columns are {available_variables}"
-                    )
-
-    def __hash__(self):
-        return self._node_hash
+        used_variables = set().union(
+            *(order_expr.scalar_expression.unbound_variables for order_expr in self.by)
+        )
+        unknown_variables = used_variables.difference(available_variables)
+        if unknown_variables:
+            raise ValueError(
+                f"Cannot order over unknown ids: {sorted(unknown_variables)}, columns are {available_variables}"
+            )
 
     @property
     def variables_introduced(self) -> int:
@@ -628,14 +784,11 @@ class OrderByNode(UnaryNode):
         return True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ReversedNode(UnaryNode):
     # useless field to make sure has distinct hash
     reversed: bool = True
 
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def variables_introduced(self) -> int:
         return 0
@@ -646,7 +799,7 @@ class ReversedNode(UnaryNode):
         return 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class SelectionNode(UnaryNode):
     input_output_pairs: typing.Tuple[typing.Tuple[str, str], ...]
 
@@ -654,10 +807,7 @@ class SelectionNode(UnaryNode):
         for input, _ in self.input_output_pairs:
             assert input in self.child.schema.names
 
-    def __hash__(self):
-        return self._node_hash
-
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
         input_types = self.child.schema._mapping
         items = tuple(
@@ -671,6 +821,11 @@ class SelectionNode(UnaryNode):
         # This operation only renames variables, doesn't actually create new ones
         return 0
 
+    @_cached_property
+    def can_fast_head(self) -> bool:
+        _resolve_bottom_up(self, "can_fast_head")
+        return self.child.can_fast_head
+
     # TODO: Reuse parent namespace
     # Currently, Selection node allows renaming an reusing existing names, so it must establish a
     # new namespace.
@@ -679,36 +834,29 @@ class SelectionNode(UnaryNode):
         return True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ProjectionNode(UnaryNode):
     """Assigns new variables (without modifying existing ones)"""
 
     assignments: typing.Tuple[typing.Tuple[ex.Expression, str], ...]
 
     def __post_init__(self):
-        input_types = self.child.schema._mapping
-        for expression, id in self.assignments:
-            # throws TypeError if invalid
-            _ = expression.output_type(input_types)
+        # throws TypeError if invalid, and keeps the output types for the schema
+        _ = self._output_dtypes
         # Cannot assign to existing variables - append only!
         assert all(name not in self.child.schema.names for _, name in self.assignments)
 
-    def __hash__(self):
-        return self._node_hash
+    @_cached_property
+    def _output_dtypes(self) -> typing.Tuple[bigframes.dtypes.Dtype, ...]:
+        return _projection_output_dtypes(self.child.schema, self.assignments)
 
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
-        input_types = self.child.schema._mapping
         items = tuple(
-            schemata.SchemaItem(
-                id, bigframes.dtypes.dtype_for_etype(ex.output_type(input_types))
-            )
-            for ex, id in self.assignments
+            schemata.SchemaItem(id, dtype)
+            for (_, id), dtype in zip(self.assignments, self._output_dtypes)
         )
-        schema = self.child.schema
-        for item in items:
-            schema = schema.append(item)
-        return schema
+        return schemata.ArraySchema((*self.child.schema.items, *items))
 
     @property
     def variables_introduced(self) -> int:
@@ -716,10 +864,15 @@ class ProjectionNode(UnaryNode):
         new_vars = sum(1 for i in self.assignments if not i[0].is_identity)
         return new_vars
 
+    @_cached_property
+    def can_fast_head(self) -> bool:
+        _resolve_bottom_up(self, "can_fast_head")
+        return self.child.can_fast_head
+
 
 # TODO: Merge RowCount into Aggregate Node?
 # Row count can be compute from table metadata sometimes, so it is a bit special.
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class RowCountNode(UnaryNode):
     @property
     def row_preserving(self) -> bool:
@@ -729,7 +882,7 @@ class RowCountNode(UnaryNode):
     def non_local(self) -> bool:
         return True
 
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
         return schemata.ArraySchema(
             (schemata.SchemaItem("count", bigframes.dtypes.INT_DTYPE),)
@@ -744,7 +897,7 @@ class RowCountNode(UnaryNode):
         return True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class AggregateNode(UnaryNode):
     aggregations: typing.Tuple[typing.Tuple[ex.Aggregation, str], ...]
     by_column_ids: typing.Tuple[str, ...] = tuple([])
@@ -754,27 +907,19 @@ class AggregateNode(UnaryNode):
     def row_preserving(self) -> bool:
         return False
 
-    def __hash__(self):
-        return self._node_hash
+    @property
+    def row_count(self) -> typing.Optional[int]:
+        return 1 if len(self.by_column_ids) == 0 else None
 
     @property
     def non_local(self) -> bool:
         return True
 
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
-        by_items = tuple(
-            schemata.SchemaItem(id, self.child.schema.get_type(id))
-            for id in self.by_column_ids
-        )
-        input_types = self.child.schema._mapping
-        agg_items = tuple(
-            schemata.SchemaItem(
-                id, bigframes.dtypes.dtype_for_etype(agg.output_type(input_types))
-            )
-            for agg, id in self.aggregations
+        return _aggregate_schema(
+            self.child.schema, self.aggregations, self.by_column_ids
         )
-        return schemata.ArraySchema(tuple([*by_items, *agg_items]))
 
     @property
     def variables_introduced(self) -> int:
@@ -793,7 +938,7 @@ class AggregateNode(UnaryNode):
         return True
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class WindowOpNode(UnaryNode):
     column_name: str
     op: agg_ops.UnaryWindowOp
@@ -802,19 +947,14 @@ class WindowOpNode(UnaryNode):
     never_skip_nulls: bool = False
     skip_reproject_unsafe: bool = False
 
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def non_local(self) -> bool:
         return True
 
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
-        input_type = self.child.schema.get_type(self.column_name)
-        new_item_dtype = self.op.output_type(input_type)
-        return self.child.schema.append(
-            schemata.SchemaItem(self.output_name, new_item_dtype)
+        return _window_schema(
+            self.child.schema, self.column_name, self.op, self.output_name
         )
 
     @property
@@ -828,11 +968,8 @@ class WindowOpNode(UnaryNode):
 
 
 # TODO: Remove this op
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ReprojectOpNode(UnaryNode):
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def variables_introduced(self) -> int:
         return 0
@@ -843,7 +980,7 @@ class ReprojectOpNode(UnaryNode):
         return 0
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class RandomSampleNode(UnaryNode):
     fraction: float
 
@@ -855,15 +992,12 @@ class RandomSampleNode(UnaryNode):
     def row_preserving(self) -> bool:
         return False
 
-    def __hash__(self):
-        return self._node_hash
-
     @property
     def variables_introduced(self) -> int:
         return 1
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class ExplodeNode(UnaryNode):
     column_ids: typing.Tuple[COL_OFFSET, ...]
 
@@ -871,32 +1005,80 @@ class ExplodeNode(UnaryNode):
     def row_preserving(self) -> bool:
         return False
 
-    def __hash__(self):
-        return self._node_hash
-
-    @functools.cached_property
+    @_cached_property
     def schema(self) -> schemata.ArraySchema:
-        items = tuple(
-            schemata.SchemaItem(
-                name,
-                bigframes.dtypes.arrow_dtype_to_bigframes_dtype(
-                    self.child.schema.get_type(name).pyarrow_dtype.value_type
-                ),
-            )
-            if offset in self.column_ids
-            else schemata.SchemaItem(name, self.child.schema.get_type(name))
-            for offset, name in enumerate(self.child.schema.names)
-        )
-        return schemata.ArraySchema(items)
+        return _explode_schema(self.child.schema, self.column_ids)
 
     @property
     def relation_ops_created(self) -> int:
         return 3
 
-    @functools.cached_property
+    @_cached_property
     def variables_introduced(self) -> int:
         return len(self.column_ids) + 1
 
     @property
     def defines_namespace(self) -> bool:
         return True
+
+
+# Schema derivations
+# Planner rewrites produce many distinct nodes applying the same operation to the same input
+# schema, so derived schemas are memoized across nodes, not just per node.
+@functools.lru_cache(maxsize=5000)
+def _projection_output_dtypes(
+    child_schema: schemata.ArraySchema,
+    assignments: typing.Tuple[typing.Tuple[ex.Expression, str], ...],
+) -> typing.Tuple[bigframes.dtypes.Dtype, ...]:
+    input_types = child_schema._mapping
+    return tuple(
+        bigframes.dtypes.dtype_for_etype(expr.output_type(input_types))
+        for expr, _ in assignments
+    )
+
+
+@functools.lru_cache(maxsize=5000)
+def _aggregate_schema(
+    child_schema: schemata.ArraySchema,
+    aggregations: typing.Tuple[typing.Tuple[ex.Aggregation, str], ...],
+    by_column_ids: typing.Tuple[str, ...],
+) -> schemata.ArraySchema:
+    input_types = child_schema._mapping
+    items = [schemata.SchemaItem(id, input_types[id]) for id in by_column_ids]
+    items.extend(
+        schemata.SchemaItem(
+            id, bigframes.dtypes.dtype_for_etype(agg.output_type(input_types))
+        )
+        for agg, id in aggregations
+    )
+    return schemata.ArraySchema(tuple(items))
+
+
+@functools.lru_cache(maxsize=5000)
+def _window_schema(
+    child_schema: schemata.ArraySchema,
+    column_name: str,
+    op: agg_ops.UnaryWindowOp,
+    output_name: str,
+) -> schemata.ArraySchema:
+    input_type = child_schema.get_type(column_name)
+    new_item_dtype = op.output_type(input_type)
+    return child_schema.append(schemata.SchemaItem(output_name, new_item_dtype))
+
+
+@functools.lru_cache(maxsize=5000)
+def _explode_schema(
+    child_schema: schemata.ArraySchema,
+    column_ids: typing.Tuple[COL_OFFSET, ...],
+) -> schemata.ArraySchema:
+    exploded_offsets = frozenset(column_ids)
+    get_type = child_schema.get_type
+    items = []
+    for offset, item in enumerate(child_schema.items):
+        if offset in exploded_offsets:
+            dtype = bigframes.dtypes.arrow_dtype_to_bigframes_dtype(
+                get_type(item.column).pyarrow_dtype.value_type
+            )
+            item = schemata.SchemaItem(item.column, dtype)
+        items.append(item)
+    return schemata.ArraySchema(tuple(items))
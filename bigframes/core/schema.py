@@ -50,7 +50,7 @@ class ArraySchema:
     def names(self) -> typing.Tuple[str, ...]:
         return tuple(item.column for item in self.items)
 
-    @property
+    @functools.cached_property
     def dtypes(self) -> typing.Tuple[bigframes.dtypes.Dtype, ...]:
         return tuple(item.dtype for item in self.items)
 
@@ -15,7 +15,7 @@ from __future__ import annotations
 
 import functools
 import itertools
-from typing import Callable, Dict, Optional, Sequence
+from typing import Callable, Dict, Mapping, Optional, Sequence
 
 import bigframes.core.nodes as nodes
 
@@ -33,41 +33,17 @@ def local_only(node: nodes.BigFrameNode) -> bool:
 
 
 def can_fast_peek(node: nodes.BigFrameNode) -> bool:
-    if local_only(node):
-        return True
-    children_peekable = all(can_fast_peek(child) for child in node.child_nodes)
-    self_peekable = not node.non_local
-    return children_peekable and self_peekable
+    return node.can_fast_peek
 
 
 def can_fast_head(node: nodes.BigFrameNode) -> bool:
     """Can get head fast if can push head operator down to leafs and operators preserve rows."""
-    if isinstance(node, nodes.LeafNode):
-        return node.supports_fast_head
-    if isinstance(node, (nodes.ProjectionNode, nodes.SelectionNode)):
-        return can_fast_head(node.child)
-    return False
+    return node.can_fast_head
 
 
 def row_count(node: nodes.BigFrameNode) -> Optional[int]:
     """Determine row count from local metadata, return None if unknown."""
-    if isinstance(node, nodes.LeafNode):
-        return node.row_count
-    if isinstance(node, nodes.AggregateNode):
-        if len(node.by_column_ids) == 0:
-            return 1
-        return None
-    if isinstance(node, nodes.ConcatNode):
-        sub_counts = list(map(row_count, node.child_nodes))
-        total = 0
-        for count in sub_counts:
-            if count is None:
-                return None
-            total += count
-        return total
-    if isinstance(node, nodes.UnaryNode) and node.row_preserving:
-        return row_count(node.child)
-    return None
+    return node.row_count
 
 
 # Replace modified_cost(node) = cost(apply_cache(node))
@@ -75,7 +51,7 @@ def select_cache_target(
     root: nodes.BigFrameNode,
     min_complexity: float,
     max_complexity: float,
-    cache: dict[nodes.BigFrameNode, nodes.BigFrameNode],
+    cache: Mapping[nodes.BigFrameNode, nodes.BigFrameNode],
     heuristic: Callable[[int, int], float],
 ) -> Optional[nodes.BigFrameNode]:
     """Take tree, and return candidate nodes with (# of occurences, post-caching planning complexity).
@@ -160,12 +136,13 @@ def count_nodes(forest: Sequence[nodes.BigFrameNode]) -> dict[nodes.BigFrameNode
 
 def replace_nodes(
     root: nodes.BigFrameNode,
-    replacements: dict[nodes.BigFrameNode, nodes.BigFrameNode],
+    replacements: Mapping[nodes.BigFrameNode, nodes.BigFrameNode],
 ):
     @functools.cache
     def apply_substition(node: nodes.BigFrameNode) -> nodes.BigFrameNode:
-        if node in replacements.keys():
-            return replacements[node]
+        replacement = replacements.get(node)
+        if replacement is not None:
+            return replacement
         else:
             return node.transform_children(apply_substition)
 
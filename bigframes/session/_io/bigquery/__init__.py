@@ -19,7 +19,6 @@ from __future__ import annotations
 import datetime
 import itertools
 import re
-import textwrap
 import types
 import typing
 from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
@@ -83,8 +82,9 @@ def create_job_configs_labels(
 
 
 def create_export_data_statement(
-    table_id: str, uri: str, format: str, export_options: Dict[str, Union[bool, str]]
+    sql: str, uri: str, format: str, export_options: Dict[str, Union[bool, str]]
 ) -> str:
+    """Wrap a query in an EXPORT DATA statement so it runs as a single job."""
     all_options: Dict[str, Union[bool, str]] = {
         "uri": uri,
         "format": format.upper(),
@@ -98,16 +98,12 @@ def create_export_data_statement(
     # Manually generate ORDER BY statement since ibis will not always generate
     # it in the top level statement. This causes BigQuery to then run
     # non-distributed sort and run out of memory.
-    return textwrap.dedent(
-        f"""
-        EXPORT DATA
-        OPTIONS (
-            {export_options_str}
-        ) AS
-        SELECT * EXCEPT ({IO_ORDERING_ID})
-        FROM `{table_id}`
-        ORDER BY {IO_ORDERING_ID}
-        """
+    return (
+        "EXPORT DATA\n"
+        f"OPTIONS ({export_options_str}) AS\n"
+        f"SELECT * EXCEPT ({IO_ORDERING_ID})\n"
+        f"FROM (\n{sql}\n)\n"
+        f"ORDER BY {IO_ORDERING_ID}\n"
     )
 
 
@@ -449,10 +445,11 @@ def select_cluster_cols(
     schema: typing.Sequence[bigquery.SchemaField],
     cluster_candidates: typing.Sequence[str],
 ) -> typing.Sequence[str]:
+    candidates = frozenset(cluster_candidates)
     return [
         item.name
         for item in schema
-        if (item.name in cluster_candidates) and _can_cluster_bq(item)
+        if (item.name in candidates) and _can_cluster_bq(item)
     ][:_MAX_CLUSTER_COLUMNS]
 
 
@@ -15,7 +15,17 @@
 from __future__ import annotations
 
 import math
-from typing import cast, Literal, Mapping, Optional, Sequence, Tuple, Union
+from typing import (
+    Callable,
+    cast,
+    Hashable,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 import warnings
 import weakref
 
@@ -43,6 +53,9 @@ QUERY_COMPLEXITY_LIMIT = 1e7
 MAX_SUBTREE_FACTORINGS = 5
 
 _MAX_CLUSTER_COLUMNS = 4
+# Previews up to this many rows are fetched along with the job results. Larger ones are left to
+# the BigQuery Storage Read API, which is not used when max_results is set.
+_MAX_PREFETCH_ROWS = 1000
 
 
 class BigQueryCachingExecutor:
@@ -70,6 +83,18 @@ class BigQueryCachingExecutor:
         self._cached_executions: weakref.WeakKeyDictionary[
             nodes.BigFrameNode, nodes.BigFrameNode
         ] = weakref.WeakKeyDictionary()
+        # Bumped whenever a cached execution is added, invalidating memoized plans
+        self._cache_generation: int = 0
+        # Maps node to (cache generation, optimized plan). None plan means the plan is the node itself,
+        # which avoids the value holding a strong reference to its own key.
+        self._optimized_plans: weakref.WeakKeyDictionary[
+            nodes.BigFrameNode, Tuple[int, Optional[nodes.BigFrameNode]]
+        ] = weakref.WeakKeyDictionary()
+        # Compiled sql per plan node, keyed by the kind of query and its compile options. Keyed on
+        # the optimized plan, so new cached executions produce a different key rather than stale sql.
+        self._compiled_sql: weakref.WeakKeyDictionary[
+            nodes.BigFrameNode, dict[Hashable, str]
+        ] = weakref.WeakKeyDictionary()
         self.metrics = metrics
 
     def to_sql(
@@ -92,11 +117,16 @@ class BigQueryCachingExecutor:
             if enable_cache
             else array_value.node
         )
-        if ordered:
-            return self.compiler.compile_ordered(
-                node, col_id_overrides=col_id_overrides
-            )
-        return self.compiler.compile_unordered(node, col_id_overrides=col_id_overrides)
+        compile_fn = (
+            self.compiler.compile_ordered
+            if ordered
+            else self.compiler.compile_unordered
+        )
+        return self._get_compiled_sql(
+            node,
+            ("sql", ordered, tuple(sorted(col_id_overrides.items()))),
+            lambda: compile_fn(node, col_id_overrides=col_id_overrides),
+        )
 
     def execute(
         self,
@@ -170,22 +200,20 @@ class BigQueryCachingExecutor:
         """
         Export the ArrayValue to gcs.
         """
-        _, query_job = self.execute(
-            array_value,
-            ordered=False,
-            col_id_overrides=col_id_overrides,
-        )
-        result_table = query_job.destination
+        if bigframes.options.compute.enable_multi_query_execution:
+            self._simplify_with_caching(array_value)
+
+        sql = self.to_sql(array_value, ordered=False, col_id_overrides=col_id_overrides)
         export_data_statement = bq_io.create_export_data_statement(
-            f"{result_table.project}.{result_table.dataset_id}.{result_table.table_id}",
+            sql,
             uri=uri,
             format=format,
             export_options=dict(export_options),
         )
-        job_config = bigquery.QueryJobConfig()
-        bq_io.add_labels(job_config, api_name=f"dataframe-to_{format.lower()}")
-        export_job = self.bqclient.query(export_data_statement, job_config=job_config)
-        self._wait_on_job(export_job)
+        _, query_job = self._run_execute_query(
+            sql=export_data_statement,
+            api_name=f"dataframe-to_{format.lower()}",
+        )
         return query_job
 
     def dry_run(self, array_value: bigframes.core.ArrayValue, ordered: bool = True):
@@ -213,11 +241,15 @@ class BigQueryCachingExecutor:
         if not tree_properties.can_fast_peek(plan):
             warnings.warn("Peeking this value cannot be done efficiently.")
 
-        sql = self.compiler.compile_peek(plan, n_rows)
+        sql = self._get_compiled_sql(
+            plan, ("peek", n_rows), lambda: self.compiler.compile_peek(plan, n_rows)
+        )
 
         # TODO(swast): plumb through the api_name of the user-facing api that
         # caused this query.
-        return self._run_execute_query(sql=sql)
+        return self._run_execute_query(
+            sql=sql, max_results=_prefetch_max_results(n_rows)
+        )
 
     def head(
         self, array_value: bigframes.core.ArrayValue, n_rows: int
@@ -239,17 +271,20 @@ class BigQueryCachingExecutor:
             # Will want to do this in a way such that the result is reusable, but the first
             # N values can be easily extracted.
             # This currently requires clustering on offsets.
-            self._cache_with_offsets(array_value)
-            # Get a new optimized plan after caching
-            plan = self._get_optimized_plan(array_value.node)
+            plan = self._cache_with_offsets(array_value)
             assert tree_properties.can_fast_head(plan)
 
-        head_plan = generate_head_plan(plan, n_rows)
-        sql = self.compiler.compile_ordered(head_plan)
+        sql = self._get_compiled_sql(
+            plan,
+            ("head", n_rows),
+            lambda: self.compiler.compile_ordered(generate_head_plan(plan, n_rows)),
+        )
 
         # TODO(swast): plumb through the api_name of the user-facing api that
         # caused this query.
-        return self._run_execute_query(sql=sql)
+        return self._run_execute_query(
+            sql=sql, max_results=_prefetch_max_results(n_rows)
+        )
 
     def get_row_count(self, array_value: bigframes.core.ArrayValue) -> int:
         count = self._local_get_row_count(array_value)
@@ -260,12 +295,15 @@ class BigQueryCachingExecutor:
                 generate_row_count_plan(array_value.node)
             )
             sql = self.compiler.compile_unordered(row_count_plan)
-            iter, _ = self._run_execute_query(sql)
+            iter, _ = self._run_execute_query(sql, max_results=1)
             return next(iter)[0]
 
     def _local_get_row_count(
         self, array_value: bigframes.core.ArrayValue
     ) -> Optional[int]:
+        count = tree_properties.row_count(array_value.node)
+        if count is not None:
+            return count
         # optimized plan has cache materializations which will have row count metadata
         # that is more likely to be usable than original leaf nodes.
         plan = self._get_optimized_plan(array_value.node)
@@ -277,9 +315,13 @@ class BigQueryCachingExecutor:
         sql: str,
         job_config: Optional[bq_job.QueryJobConfig] = None,
         api_name: Optional[str] = None,
+        max_results: Optional[int] = None,
     ) -> Tuple[bigquery.table.RowIterator, bigquery.QueryJob]:
         """
         Starts BigQuery query job and waits for results.
+
+        Set max_results only for small results, so the first page is fetched by the same call that
+        waits on the job. Setting it disables the BigQuery Storage Read API for the results.
         """
         job_config = bq_job.QueryJobConfig() if job_config is None else job_config
         if bigframes.options.compute.maximum_bytes_billed is not None:
@@ -293,7 +335,7 @@ class BigQueryCachingExecutor:
             job_config.labels["bigframes-mode"] = "unordered"
         try:
             query_job = self.bqclient.query(sql, job_config=job_config)
-            return self._wait_on_job(query_job), query_job
+            return self._wait_on_job(query_job, max_results=max_results), query_job
 
         except google.api_core.exceptions.BadRequest as e:
             # Unfortunately, this error type does not have a separate error code or exception type
@@ -303,14 +345,16 @@ class BigQueryCachingExecutor:
             else:
                 raise
 
-    def _wait_on_job(self, query_job: bigquery.QueryJob) -> bigquery.table.RowIterator:
+    def _wait_on_job(
+        self, query_job: bigquery.QueryJob, max_results: Optional[int] = None
+    ) -> bigquery.table.RowIterator:
         opts = bigframes.options.display
         if opts.progress_bar is not None and not query_job.configuration.dry_run:
             results_iterator = formatting_helpers.wait_for_query_job(
-                query_job, progress_bar=opts.progress_bar
+                query_job, max_results=max_results, progress_bar=opts.progress_bar
             )
         else:
-            results_iterator = query_job.result()
+            results_iterator = query_job.result(max_results=max_results)
 
         if self.metrics is not None:
             self.metrics.count_job_stats(query_job)
@@ -322,12 +366,31 @@ class BigQueryCachingExecutor:
 
         At present, the only optimization is to replace subtress with cached previous materializations.
         """
+        memoized = self._optimized_plans.get(node)
+        if memoized is not None and memoized[0] == self._cache_generation:
+            return node if memoized[1] is None else memoized[1]
+
         # Apply any rewrites *after* applying cache, as cache is sensitive to exact tree structure
-        optimized_plan = tree_properties.replace_nodes(
-            node, (dict(self._cached_executions))
+        optimized_plan = tree_properties.replace_nodes(node, self._cached_executions)
+        self._optimized_plans[node] = (
+            self._cache_generation,
+            None if optimized_plan is node else optimized_plan,
         )
         return optimized_plan
 
+    def _get_compiled_sql(
+        self,
+        node: nodes.BigFrameNode,
+        options_key: Hashable,
+        compile_fn: Callable[[], str],
+    ) -> str:
+        sql_by_options = self._compiled_sql.setdefault(node, {})
+        sql = sql_by_options.get(options_key)
+        if sql is None:
+            sql = compile_fn()
+            sql_by_options[options_key] = sql
+        return sql
+
     def _is_trivially_executable(self, array_value: bigframes.core.ArrayValue):
         """
         Can the block be evaluated very cheaply?
@@ -353,13 +416,18 @@ class BigQueryCachingExecutor:
             cluster_cols=bq_io.select_cluster_cols(schema, cluster_cols),
         )
         cached_replacement = array_value.as_cached(
-            cache_table=self.bqclient.get_table(tmp_table),
+            cache_table=tmp_table,
             ordering=ordering_info,
         ).node
-        self._cached_executions[array_value.node] = cached_replacement
+        self._set_cached_execution(array_value.node, cached_replacement)
 
-    def _cache_with_offsets(self, array_value: bigframes.core.ArrayValue):
-        """Executes the query and uses the resulting table to rewrite future executions."""
+    def _cache_with_offsets(
+        self, array_value: bigframes.core.ArrayValue
+    ) -> nodes.BigFrameNode:
+        """Executes the query and uses the resulting table to rewrite future executions.
+
+        Returns the cached replacement node, which is also the new optimized plan for the value.
+        """
         offset_column = bigframes.core.guid.generate_guid("bigframes_offsets")
         w_offsets, offset_column = array_value.promote_offsets()
         sql = self.compiler.compile_unordered(self._get_optimized_plan(w_offsets.node))
@@ -370,10 +438,17 @@ class BigQueryCachingExecutor:
             cluster_cols=[offset_column],
         )
         cached_replacement = array_value.as_cached(
-            cache_table=self.bqclient.get_table(tmp_table),
+            cache_table=tmp_table,
             ordering=order.TotalOrdering.from_offset_col(offset_column),
         ).node
-        self._cached_executions[array_value.node] = cached_replacement
+        self._set_cached_execution(array_value.node, cached_replacement)
+        return cached_replacement
+
+    def _set_cached_execution(
+        self, original: nodes.BigFrameNode, replacement: nodes.BigFrameNode
+    ):
+        self._cached_executions[original] = replacement
+        self._cache_generation += 1
 
     def _cache_with_session_awareness(
         self,
@@ -411,7 +486,7 @@ class BigQueryCachingExecutor:
             node,
             min_complexity=(QUERY_COMPLEXITY_LIMIT / 500),
             max_complexity=QUERY_COMPLEXITY_LIMIT,
-            cache=dict(self._cached_executions),
+            cache=self._cached_executions,
             # Heuristic: subtree_compleixty * (copies of subtree)^2
             heuristic=lambda complexity, count: math.log(complexity)
             + 2 * math.log(count),
@@ -428,7 +503,12 @@ class BigQueryCachingExecutor:
         sql: str,
         schema: Sequence[bigquery.SchemaField],
         cluster_cols: Sequence[str],
-    ) -> bigquery.TableReference:
+    ) -> bigquery.Table:
+        """
+        Materializes the sql into a new temp table.
+
+        The table metadata is assembled from the finished job rather than fetched with get_table.
+        """
         assert len(cluster_cols) <= _MAX_CLUSTER_COLUMNS
         temp_table = self.storage_manager.create_temp_table(schema, cluster_cols)
 
@@ -438,14 +518,24 @@ class BigQueryCachingExecutor:
             bigquery.QueryJobConfig.from_api_repr({}),
         )
         job_config.destination = temp_table
-        _, query_job = self._run_execute_query(
+        results_iterator, query_job = self._run_execute_query(
             sql,
             job_config=job_config,
             api_name="cached",
         )
-        query_job.destination
-        query_job.result()
-        return query_job.destination
+        resource = {
+            "tableReference": query_job.destination.to_api_repr(),
+            "schema": {"fields": [field.to_api_repr() for field in schema]},
+        }
+        if results_iterator.total_rows is not None:
+            resource["numRows"] = str(results_iterator.total_rows)
+        if cluster_cols:
+            resource["clustering"] = {"fields": list(cluster_cols)}
+        return bigquery.Table.from_api_repr(resource)
+
+
+def _prefetch_max_results(n_rows: int) -> Optional[int]:
+    return n_rows if n_rows <= _MAX_PREFETCH_ROWS else None
 
 
 def generate_head_plan(node: nodes.BigFrameNode, n: int):
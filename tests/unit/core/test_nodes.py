@@ -0,0 +1,313 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import gc
+import unittest.mock as mock
+
+import google.cloud.bigquery
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import bigframes
+import bigframes.core as core
+import bigframes.core.expression as ex
+import bigframes.core.nodes as nodes
+import bigframes.core.ordering as ordering
+import bigframes.core.schema
+import bigframes.operations as ops
+import bigframes.operations.aggregations as agg_ops
+
+TABLE_REF = google.cloud.bigquery.TableReference.from_string("project.dataset.table")
+SCHEMA = (
+    google.cloud.bigquery.SchemaField("col_a", "INTEGER"),
+    google.cloud.bigquery.SchemaField("col_b", "INTEGER"),
+)
+TABLE = google.cloud.bigquery.Table(
+    table_ref=TABLE_REF,
+    schema=SCHEMA,
+)
+FAKE_SESSION = mock.create_autospec(bigframes.Session, instance=True)
+type(FAKE_SESSION)._strictly_ordered = mock.PropertyMock(return_value=True)
+LEAF: core.ArrayValue = core.ArrayValue.from_table(
+    session=FAKE_SESSION,
+    table=TABLE,
+    schema=bigframes.core.schema.ArraySchema.from_bq_table(TABLE),
+)
+
+
+def test_roots_shared_subtree():
+    left = nodes.ReversedNode(LEAF.node)
+    right = nodes.ReprojectOpNode(LEAF.node)
+    join = nodes.JoinNode(left, right, conditions=(), type="cross")
+
+    assert join.roots == frozenset({LEAF.node})
+
+
+def test_roots_deep_tree_does_not_recurse():
+    node = LEAF.node
+    for _ in range(5000):
+        node = nodes.ReprojectOpNode(node)
+
+    assert node.roots == frozenset({LEAF.node})
+    assert node.roots is LEAF.node.roots
+
+
+def test_roots_unresolved_shared_subtree():
+    shared = nodes.ReprojectOpNode(nodes.ReversedNode(LEAF.node))
+    join = nodes.JoinNode(shared, shared, conditions=(), type="cross")
+    concat = nodes.ConcatNode((join, join, join))
+
+    assert "roots" not in shared.__dict__
+    assert concat.roots == frozenset({LEAF.node})
+    assert shared.__dict__["roots"] == frozenset({LEAF.node})
+    assert join.__dict__["roots"] == frozenset({LEAF.node})
+
+
+def test_planning_complexity_totals():
+    # LEAF reads 2 columns: 3 variables and 3 relational ops
+    shared = nodes.ReversedNode(LEAF.node)
+    inner = nodes.JoinNode(shared, LEAF.node, conditions=(), type="cross")
+    outer = nodes.JoinNode(inner, shared, conditions=(), type="cross")
+
+    assert inner.total_variables == 11
+    assert inner.total_relational_ops == 7
+    assert inner.total_joins == 1
+    assert outer.total_variables == 19
+    assert outer.total_relational_ops == 11
+    assert outer.total_joins == 2
+    assert outer.planning_complexity == 627
+
+
+def test_node_subclasses_use_cached_hash():
+    node = nodes.ReprojectOpNode(LEAF.node)
+
+    assert nodes.ReprojectOpNode.__hash__ is nodes.BigFrameNode.__hash__
+    assert hash(node) == node.__dict__["_node_hash"]
+
+
+def test_single_field_node_hash_differs_from_child():
+    node = nodes.ReprojectOpNode(LEAF.node)
+    nested = nodes.ReprojectOpNode(node)
+
+    assert hash(node) != hash(LEAF.node)
+    assert hash(nested) != hash(node)
+    assert hash(nodes.RowCountNode(LEAF.node)) != hash(LEAF.node)
+
+
+def test_equal_nodes_are_interned():
+    node_a = nodes.ReversedNode(LEAF.node)
+    node_b = nodes.ReversedNode(LEAF.node)
+
+    assert node_a is node_b
+    assert node_a.transform_children(lambda child: child) is node_a
+
+
+def test_interned_nodes_are_released():
+    node = nodes.ReversedNode(nodes.ReprojectOpNode(LEAF.node))
+    interned_count = len(nodes._INTERNED_NODES)
+
+    del node
+    gc.collect()
+
+    assert len(nodes._INTERNED_NODES) == interned_count - 2
+
+
+def test_node_equality_is_identity():
+    node = nodes.ReversedNode(LEAF.node)
+
+    assert nodes.ReversedNode.__eq__ is object.__eq__
+    assert node == nodes.ReversedNode(LEAF.node)
+    assert node != nodes.ReprojectOpNode(LEAF.node)
+    assert nodes.ReprojectOpNode.__hash__ is nodes.BigFrameNode.__hash__
+
+
+def test_concat_mismatched_dtypes_raises():
+    narrow = nodes.SelectionNode(LEAF.node, (("col_a", "col_a"),))
+
+    with pytest.raises(ValueError, match="identical dtypes"):
+        nodes.ConcatNode((LEAF.node, LEAF.node, narrow))
+
+
+def test_session_from_multiple_sessions_raises():
+    other_session = mock.create_autospec(bigframes.Session, instance=True)
+    other_leaf = core.ArrayValue.from_table(
+        session=other_session,
+        table=TABLE,
+        schema=bigframes.core.schema.ArraySchema.from_bq_table(TABLE),
+    )
+    join = nodes.JoinNode(LEAF.node, other_leaf.node, conditions=(), type="cross")
+
+    assert nodes.ReversedNode(LEAF.node).session is FAKE_SESSION
+    with pytest.raises(ValueError, match="multiple sessions"):
+        join.session
+
+
+def test_cached_property_stores_value_on_instance():
+    node = nodes.ReversedNode(LEAF.node)
+
+    schema = node.schema
+
+    assert node.__dict__["schema"] is schema
+    assert node.schema is schema
+    assert isinstance(nodes.ReversedNode.schema, nodes._cached_property)
+
+
+def test_projection_output_types_shared_across_nodes():
+    assignments = ((ex.const(1), "col_c"),)
+    node_a = nodes.ProjectionNode(nodes.ReversedNode(LEAF.node), assignments)
+    node_b = nodes.ProjectionNode(nodes.ReprojectOpNode(LEAF.node), assignments)
+
+    assert node_a is not node_b
+    assert node_a._output_dtypes is node_b._output_dtypes
+    assert node_a.schema.names == ("col_a", "col_b", "col_c")
+    assert node_a.schema.dtypes[-1] == pd.Int64Dtype()
+
+
+def test_explode_schema_unwraps_exploded_offsets():
+    local = core.ArrayValue.from_pyarrow(
+        pa.table({"nums": [[1, 2]], "words": [["a"]], "other": [1.5]}),
+        session=FAKE_SESSION,
+    )
+    node = nodes.ExplodeNode(local.node, column_ids=(0, 1))
+
+    assert node.schema.names == ("nums", "words", "other")
+    assert node.schema.dtypes == (
+        pd.Int64Dtype(),
+        pd.StringDtype(storage="pyarrow"),
+        pd.Float64Dtype(),
+    )
+
+
+def test_join_schema_renames_both_sides_positionally():
+    narrow = nodes.SelectionNode(LEAF.node, (("col_b", "col_b"),))
+    join = nodes.JoinNode(LEAF.node, narrow, conditions=(), type="cross")
+
+    assert join.schema.names == ("col_0", "col_1", "col_2")
+    assert join.schema.dtypes == LEAF.node.schema.dtypes + narrow.schema.dtypes
+
+
+def test_order_by_unknown_column_raises():
+    by = (
+        ordering.ascending_over("col_a"),
+        ordering.descending_over("col_z"),
+    )
+
+    with pytest.raises(ValueError, match="col_z"):
+        nodes.OrderByNode(LEAF.node, by)
+
+
+def test_read_table_unknown_column_raises():
+    columns = bigframes.core.schema.ArraySchema(
+        (bigframes.core.schema.SchemaItem("col_z", pd.Int64Dtype()),)
+    )
+
+    with pytest.raises(ValueError, match="cannot be derived"):
+        nodes.ReadTableNode(
+            table=nodes.GbqTable.from_table(TABLE),
+            columns=columns,
+            table_session=FAKE_SESSION,
+            total_order_cols=(),
+        )
+
+
+def test_child_nodes_built_once():
+    node = nodes.ReversedNode(LEAF.node)
+
+    assert node.child_nodes is node.child_nodes
+    assert node.child_nodes == (LEAF.node,)
+    assert LEAF.node.child_nodes == ()
+    assert "child_nodes" not in vars(nodes.ReadTableNode)
+
+
+def test_projection_computes_output_types_once():
+    assignments = ((ops.add_op.as_expr("col_a", ex.const(1)), "col_c"),)
+    nodes._projection_output_dtypes.cache_clear()
+
+    with mock.patch.object(
+        ex.OpExpression, "output_type", autospec=True, return_value=pd.Int64Dtype()
+    ) as output_type:
+        node = nodes.ProjectionNode(nodes.ReversedNode(LEAF.node), assignments)
+        node.schema
+
+    output_type.assert_called_once()
+
+
+def test_aggregate_schema_by_columns_then_aggregations():
+    aggregations = (
+        (ex.UnaryAggregation(agg_ops.sum_op, ex.free_var("col_b")), "total"),
+    )
+    node = nodes.AggregateNode(LEAF.node, aggregations, by_column_ids=("col_a",))
+
+    assert node.schema.names == ("col_a", "total")
+    assert node.schema.dtypes == (pd.Int64Dtype(), pd.Int64Dtype())
+
+
+def test_order_ambiguous_is_cached():
+    node = nodes.ConcatNode((nodes.ReversedNode(LEAF.node), LEAF.node))
+
+    assert node.order_ambiguous
+    assert node.__dict__["order_ambiguous"] is True
+    assert node.children[0].__dict__["order_ambiguous"] is True
+
+
+def test_cached_table_order_ambiguous():
+    cached = nodes.CachedTableNode(
+        original_node=LEAF.node,
+        table=nodes.GbqTable.from_table(TABLE),
+        ordering=ordering.TotalOrdering.from_offset_col("col_a"),
+    )
+
+    assert not cached.order_ambiguous
+
+
+def test_transform_children_noop_skips_construction():
+    unary = nodes.ReversedNode(LEAF.node)
+    join = nodes.JoinNode(unary, LEAF.node, conditions=(), type="cross")
+    concat = nodes.ConcatNode((unary, unary))
+
+    with mock.patch.object(nodes, "replace") as replace:
+        assert unary.transform_children(lambda child: child) is unary
+        assert join.transform_children(lambda child: child) is join
+        assert concat.transform_children(lambda child: child) is concat
+
+    replace.assert_not_called()
+    replaced = join.transform_children(
+        lambda child: nodes.ReprojectOpNode(LEAF.node) if child is LEAF.node else child
+    )
+    assert replaced.child_nodes == (unary, nodes.ReprojectOpNode(LEAF.node))
+
+
+def test_row_count_from_local_metadata():
+    local = core.ArrayValue.from_pyarrow(
+        pa.table({"col": [1, 2, 3]}), session=FAKE_SESSION
+    ).node
+    concat = nodes.ConcatNode((local, nodes.ReversedNode(local)))
+    predicate = ops.gt_op.as_expr(ex.free_var("col"), ex.const(1))
+
+    assert concat.row_count == 6
+    assert nodes.FilterNode(local, predicate).row_count is None
+    assert nodes.AggregateNode(local, aggregations=()).row_count == 1
+
+
+def test_fast_path_properties_deep_tree_do_not_recurse():
+    node = LEAF.node
+    for _ in range(5000):
+        node = nodes.SelectionNode(node, (("col_a", "col_a"), ("col_b", "col_b")))
+
+    assert node.can_fast_head == LEAF.node.can_fast_head
+    assert node.can_fast_peek
+    assert node.row_count is None
+    assert "can_fast_head" in node.__dict__
@@ -0,0 +1,252 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import unittest.mock as mock
+
+import google.cloud.bigquery
+import pyarrow as pa
+import pytest
+
+import bigframes
+import bigframes.core as core
+import bigframes.core.nodes as nodes
+import bigframes.core.schema
+import bigframes.core.tree_properties as tree_properties
+import bigframes.formatting_helpers
+import bigframes.session._io.bigquery
+import bigframes.session.executor
+import bigframes.session.temp_storage
+
+TABLE_REF = google.cloud.bigquery.TableReference.from_string("project.dataset.table")
+SCHEMA = (
+    google.cloud.bigquery.SchemaField("col_a", "INTEGER"),
+    google.cloud.bigquery.SchemaField("col_b", "INTEGER"),
+)
+TABLE = google.cloud.bigquery.Table(
+    table_ref=TABLE_REF,
+    schema=SCHEMA,
+)
+FAKE_SESSION = mock.create_autospec(bigframes.Session, instance=True)
+type(FAKE_SESSION)._strictly_ordered = mock.PropertyMock(return_value=True)
+LEAF: core.ArrayValue = core.ArrayValue.from_table(
+    session=FAKE_SESSION,
+    table=TABLE,
+    schema=bigframes.core.schema.ArraySchema.from_bq_table(TABLE),
+)
+
+
+@pytest.fixture
+def executor() -> bigframes.session.executor.BigQueryCachingExecutor:
+    bqclient = mock.create_autospec(google.cloud.bigquery.Client, instance=True)
+    storage_manager = mock.create_autospec(
+        bigframes.session.temp_storage.TemporaryGbqStorageManager, instance=True
+    )
+    return bigframes.session.executor.BigQueryCachingExecutor(
+        bqclient=bqclient, storage_manager=storage_manager
+    )
+
+
+def test_optimized_plan_memoized_until_cache_changes(executor):
+    node = nodes.ReversedNode(LEAF.node)
+    replacement = nodes.ReprojectOpNode(LEAF.node)
+
+    with mock.patch.object(
+        tree_properties, "replace_nodes", wraps=tree_properties.replace_nodes
+    ) as replace_nodes:
+        assert executor._get_optimized_plan(node) is node
+        assert executor._get_optimized_plan(node) is node
+        assert replace_nodes.call_count == 1
+
+        executor._set_cached_execution(node, replacement)
+
+        assert executor._get_optimized_plan(node) is replacement
+        assert executor._get_optimized_plan(node) is replacement
+        assert replace_nodes.call_count == 2
+
+
+def test_to_sql_reuses_compiled_sql(executor):
+    value = core.ArrayValue(nodes.ReversedNode(LEAF.node))
+
+    with mock.patch.object(
+        executor.compiler, "compile_ordered", wraps=executor.compiler.compile_ordered
+    ) as compile_ordered:
+        first = executor.to_sql(value, ordered=True)
+        second = executor.to_sql(value, ordered=True)
+        renamed = executor.to_sql(
+            value, ordered=True, col_id_overrides={"col_a": "renamed"}
+        )
+
+    assert first == second
+    assert "renamed" in renamed
+    assert compile_ordered.call_count == 2
+
+
+def test_simplify_with_caching_checks_optimized_plan_complexity(executor):
+    # A cached table introduces more variables than the leaf it replaces, so caching can
+    # raise the complexity of a plan above that of the original.
+    reversed_node = nodes.ReversedNode(LEAF.node)
+    node: nodes.BigFrameNode = reversed_node
+    for _ in range(20):
+        node = nodes.SelectionNode(node, (("col_a", "col_a"), ("col_b", "col_b")))
+    cached = LEAF.as_cached(cache_table=TABLE, ordering=None).node
+    executor._set_cached_execution(reversed_node, cached)
+    optimized = executor._get_optimized_plan(node)
+    assert node.planning_complexity < optimized.planning_complexity
+
+    with mock.patch.object(
+        bigframes.session.executor,
+        "QUERY_COMPLEXITY_LIMIT",
+        optimized.planning_complexity,
+    ), mock.patch.object(
+        executor, "_cache_most_complex_subtree", return_value=False
+    ) as cache_most_complex_subtree:
+        executor._simplify_with_caching(core.ArrayValue(node))
+
+    cache_most_complex_subtree.assert_called_once_with(node)
+
+
+def test_export_gcs_runs_single_query(executor):
+    value, ordering_id = LEAF.promote_offsets()
+
+    executor.export_gcs(
+        value,
+        {ordering_id: bigframes.session._io.bigquery.IO_ORDERING_ID},
+        "gs://bucket/path-*.csv",
+        format="csv",
+        export_options={},
+    )
+
+    executor.bqclient.query.assert_called_once()
+    sql = executor.bqclient.query.call_args.args[0]
+    assert sql.startswith("EXPORT DATA")
+    executor.storage_manager.create_temp_table.assert_not_called()
+
+
+def _mock_cache_job(executor, total_rows: int):
+    destination = google.cloud.bigquery.TableReference.from_string(
+        "project.dataset.cached"
+    )
+    query_job = mock.create_autospec(google.cloud.bigquery.QueryJob, instance=True)
+    query_job.destination = destination
+    query_job.result.return_value.total_rows = total_rows
+    executor.storage_manager.create_temp_table.return_value = destination
+    executor.bqclient.query.return_value = query_job
+
+
+def test_cache_with_cluster_cols_uses_job_metadata(executor):
+    _mock_cache_job(executor, total_rows=42)
+
+    with bigframes.option_context("display.progress_bar", None):
+        executor._cache_with_cluster_cols(LEAF, ["col_a"])
+
+    executor.bqclient.get_table.assert_not_called()
+    cached = executor._cached_executions[LEAF.node]
+    assert isinstance(cached, nodes.CachedTableNode)
+    assert cached.table.table_id == "cached"
+    assert cached.table.n_rows == 42
+    assert cached.table.cluster_cols == ("col_a",)
+    schema, _ = executor.storage_manager.create_temp_table.call_args.args
+    assert cached.table.physical_schema == tuple(schema)
+
+
+def test_local_row_count_skips_planning_when_known(executor):
+    local = core.ArrayValue.from_pyarrow(
+        pa.table({"col": [1, 2, 3]}), session=FAKE_SESSION
+    )
+
+    with mock.patch.object(
+        executor, "_get_optimized_plan", wraps=executor._get_optimized_plan
+    ) as get_optimized_plan:
+        assert executor._local_get_row_count(local) == 3
+
+    get_optimized_plan.assert_not_called()
+
+
+def test_cache_with_offsets_returns_optimized_plan(executor):
+    value = core.ArrayValue(nodes.ReversedNode(LEAF.node))
+    _mock_cache_job(executor, total_rows=42)
+
+    with bigframes.option_context("display.progress_bar", None):
+        plan = executor._cache_with_offsets(value)
+
+    assert isinstance(plan, nodes.CachedTableNode)
+    assert plan.can_fast_head
+    assert executor._get_optimized_plan(value.node) is plan
+
+
+def test_peek_reuses_compiled_sql(executor):
+    value = core.ArrayValue(nodes.ReversedNode(LEAF.node))
+
+    with mock.patch.object(
+        executor.compiler, "compile_peek", wraps=executor.compiler.compile_peek
+    ) as compile_peek, bigframes.option_context("display.progress_bar", None):
+        executor.peek(value, 10)
+        executor.peek(value, 10)
+        executor.peek(value, 20)
+
+    assert compile_peek.call_count == 2
+    first, second, third = (
+        call.args[0] for call in executor.bqclient.query.call_args_list
+    )
+    assert first == second
+    assert first != third
+
+
+def test_peek_fetches_first_page_with_job(executor):
+    value = core.ArrayValue(nodes.ReversedNode(LEAF.node))
+
+    with bigframes.option_context("display.progress_bar", None):
+        executor.peek(value, 10)
+
+    executor.bqclient.query.return_value.result.assert_called_once_with(max_results=10)
+
+
+def test_peek_large_result_does_not_set_max_results(executor):
+    value = core.ArrayValue(nodes.ReversedNode(LEAF.node))
+
+    with bigframes.option_context("display.progress_bar", None):
+        executor.peek(value, 1_000_000)
+
+    executor.bqclient.query.return_value.result.assert_called_once_with(
+        max_results=None
+    )
+
+
+def test_peek_with_progress_bar_fetches_first_page_with_job(executor):
+    value = core.ArrayValue(nodes.ReversedNode(LEAF.node))
+    executor.bqclient.query.return_value.configuration.dry_run = False
+
+    with mock.patch.object(
+        bigframes.formatting_helpers, "wait_for_query_job"
+    ) as wait_for_query_job, bigframes.option_context(
+        "display.progress_bar", "terminal"
+    ):
+        executor.peek(value, 10)
+
+    wait_for_query_job.assert_called_once_with(
+        executor.bqclient.query.return_value,
+        max_results=10,
+        progress_bar="terminal",
+    )
+
+
+def test_get_row_count_fetches_single_row_with_job(executor):
+    query_job = executor.bqclient.query.return_value
+    query_job.result.return_value = iter([(42,)])
+
+    with bigframes.option_context("display.progress_bar", None):
+        assert executor.get_row_count(LEAF) == 42
+
+    query_job.result.assert_called_once_with(max_results=1)
@@ -148,6 +148,35 @@ def test_create_job_configs_labels_length_limit_met():
     assert "source" in labels.keys()
 
 
+def test_create_export_data_statement_wraps_query():
+    sql = io_bq.create_export_data_statement(
+        "SELECT 1 AS `col`, 0 AS `bqdf_row_nums`",
+        uri="gs://bucket/path-*.csv",
+        format="csv",
+        export_options={"header": True},
+    )
+
+    assert sql.startswith("EXPORT DATA\nOPTIONS (uri='gs://bucket/path-*.csv'")
+    assert "format='CSV'" in sql
+    assert "header=true" in sql
+    assert "FROM (\nSELECT 1 AS `col`, 0 AS `bqdf_row_nums`\n)" in sql
+    assert sql.rstrip().endswith(f"ORDER BY {io_bq.IO_ORDERING_ID}")
+
+
+def test_select_cluster_cols_keeps_schema_order_and_skips_unclusterable():
+    schema = [
+        bigquery.SchemaField("f", "FLOAT"),
+        bigquery.SchemaField("a", "INTEGER"),
+        bigquery.SchemaField("b", "STRING"),
+        bigquery.SchemaField("c", "INTEGER"),
+    ]
+
+    assert io_bq.select_cluster_cols(schema, ["c", "f", "a", "missing"]) == [
+        "a",
+        "c",
+    ]
+
+
 def test_create_temp_table_default_expiration():
     """Make sure the created table has an expiration."""
     expiration = datetime.datetime(